@@ -4,6 +4,7 @@ from sqlalchemy import select
 
 from app.core.database import get_db
 from app.core.security import get_password_hash, create_access_token, verify_password
+from app.core.sharding import shard_router
 from app.models.user import User
 from app.schemas.user import UserCreate, Token
 
@@ -37,6 +38,9 @@ async def register(
     await db.commit()
     await db.refresh(user)
     
+    # Закрепляем пользователя за шардом
+    await shard_router.register_tenant(db, user.id)
+    
     # Создаем токен
     access_token = create_access_token(data={"sub": str(user.id)})
     
@@ -3,25 +3,33 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.sharding import get_tenant_db, shard_router
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.contact import Contact
-from app.schemas.contact import ContactCreate, ContactUpdate, ContactResponse
+from app.schemas.contact import ContactCreate, ContactUpdate, ContactResponse, ContactPartial
+from app.api.v1.fields import (
+    all_fields, default_list_fields, parse_fields, partial_response, select_columns,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ContactResponse])
+FIELDS_DESCRIPTION = "Поля через запятую, например id,full_name,email"
+
+@router.get("/", response_model=List[ContactPartial], response_model_exclude_unset=True)
 async def read_contacts(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
-    """Получить список контактов"""
+    """Получить список контактов (заметки - только через fields=)"""
+    columns = parse_fields(Contact, fields, default_list_fields(Contact))
+    
     # Базовый запрос
-    query = select(Contact).where(Contact.user_id == current_user.id)
+    query = select(*select_columns(Contact, columns)).where(Contact.user_id == current_user.id)
     
     # Простой поиск по имени или email
     if search:
@@ -35,13 +43,12 @@ async def read_contacts(
     query = query.offset(skip).limit(limit)
     
     result = await db.execute(query)
-    contacts = result.scalars().all()
-    return contacts
+    return result.mappings().all()
 
 @router.post("/", response_model=ContactResponse)
 async def create_contact(
     contact_in: ContactCreate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     """Создать новый контакт"""
@@ -57,7 +64,11 @@ async def create_contact(
             raise HTTPException(400, "Contact with this email already exists")
     
     # Создаем контакт
-    contact = Contact(**contact_in.dict(), user_id=current_user.id)
+    contact = Contact(
+        **contact_in.dict(),
+        id=await shard_router.next_id(Contact),
+        user_id=current_user.id,
+    )
     
     db.add(contact)
     await db.commit()
@@ -68,28 +79,32 @@ async def create_contact(
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def read_contact(
     contact_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
     """Получить контакт по ID"""
+    columns = parse_fields(Contact, fields, all_fields(Contact))
     result = await db.execute(
-        select(Contact).where(
+        select(*select_columns(Contact, columns)).where(
             Contact.id == contact_id,
             Contact.user_id == current_user.id
         )
     )
-    contact = result.scalar_one_or_none()
+    contact = result.mappings().one_or_none()
     
     if not contact:
         raise HTTPException(404, "Contact not found")
     
+    if fields:
+        return partial_response(ContactPartial, contact)
     return contact
 
 @router.put("/{contact_id}", response_model=ContactResponse)
 async def update_contact(
     contact_id: int,
     contact_in: ContactUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     """Обновить контакт"""
@@ -117,7 +132,7 @@ async def update_contact(
 @router.delete("/{contact_id}")
 async def delete_contact(
     contact_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     """Удалить контакт"""
@@ -3,37 +3,43 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.sharding import get_tenant_db, shard_router
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.deal import Deal
-from app.schemas.deal import DealCreate, DealUpdate, DealResponse
+from app.schemas.deal import DealCreate, DealUpdate, DealResponse, DealPartial
+from app.api.v1.fields import (
+    all_fields, default_list_fields, parse_fields, partial_response, select_columns,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[DealResponse])
+FIELDS_DESCRIPTION = "Поля через запятую, например id,title,amount,stage"
+
+@router.get("/", response_model=List[DealPartial], response_model_exclude_unset=True)
 async def read_deals(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
     """
-    Получить список сделок пользователя
+    Получить список сделок пользователя (описание - только через fields=)
     """
+    columns = parse_fields(Deal, fields, default_list_fields(Deal))
     result = await db.execute(
-        select(Deal)
+        select(*select_columns(Deal, columns))
         .where(Deal.user_id == current_user.id)
         .offset(skip)
         .limit(limit)
     )
-    deals = result.scalars().all()
-    return deals
+    return result.mappings().all()
 
 @router.post("/", response_model=DealResponse)
 async def create_deal(
     deal_in: DealCreate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -44,7 +50,11 @@ async def create_deal(
         raise HTTPException(400, "Amount cannot be negative")
     
     # Создаем сделку
-    deal = Deal(**deal_in.dict(), user_id=current_user.id)
+    deal = Deal(
+        **deal_in.dict(),
+        id=await shard_router.next_id(Deal),
+        user_id=current_user.id,
+    )
     
     db.add(deal)
     await db.commit()
@@ -55,30 +65,34 @@ async def create_deal(
 @router.get("/{deal_id}", response_model=DealResponse)
 async def read_deal(
     deal_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
 ):
     """
     Получить сделку по ID
     """
+    columns = parse_fields(Deal, fields, all_fields(Deal))
     result = await db.execute(
-        select(Deal).where(
+        select(*select_columns(Deal, columns)).where(
             Deal.id == deal_id,
             Deal.user_id == current_user.id
         )
     )
-    deal = result.scalar_one_or_none()
+    deal = result.mappings().one_or_none()
     
     if not deal:
         raise HTTPException(404, "Deal not found")
     
+    if fields:
+        return partial_response(DealPartial, deal)
     return deal
 
 @router.put("/{deal_id}", response_model=DealResponse)
 async def update_deal(
     deal_id: int,
     deal_in: DealUpdate,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -108,7 +122,7 @@ async def update_deal(
 @router.delete("/{deal_id}")
 async def delete_deal(
     deal_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_tenant_db),
     current_user: User = Depends(get_current_user),
 ):
     """
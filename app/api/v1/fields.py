@@ -0,0 +1,53 @@
+"""
+Sparse fieldsets: параметр fields= для list/detail эндпоинтов.
+
+Клиент передает список полей через запятую, и мы выбираем из БД только эти
+колонки. Большие текстовые колонки (Text) в списках по умолчанию не грузятся
+и отдаются только если их запросили явно. Detail-эндпоинты без fields=
+отдают полную схему ответа, а с fields= - только выбранные поля в обход
+response_model.
+"""
+from typing import List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import Text
+
+
+def all_fields(model) -> List[str]:
+    """Все колонки модели"""
+    return [column.name for column in model.__table__.columns]
+
+
+def default_list_fields(model) -> List[str]:
+    """Колонки для списков: все, кроме больших текстовых"""
+    return [
+        column.name
+        for column in model.__table__.columns
+        if not isinstance(column.type, Text)
+    ]
+
+
+def parse_fields(model, fields: Optional[str], default: List[str]) -> List[str]:
+    """Разобрать fields= в список колонок; id возвращается всегда"""
+    if not fields:
+        return default
+
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    known = all_fields(model)
+    unknown = [name for name in requested if name not in known]
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}")
+
+    return [name for name in known if name == "id" or name in requested]
+
+
+def select_columns(model, names: List[str]) -> list:
+    """Колонки модели для select()"""
+    return [getattr(model, name) for name in names]
+
+
+def partial_response(schema, row) -> JSONResponse:
+    """Ответ только с выбранными колонками строки"""
+    return JSONResponse(jsonable_encoder(schema(**row), exclude_unset=True))
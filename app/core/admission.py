@@ -0,0 +1,180 @@
+"""
+Admission control и сброс нагрузки.
+
+Запросы делятся на группы (auth, write, read). Общий лимит параллельных
+запросов защищает пул соединений БД; несколько слотов из него
+зарезервированы за auth и write, остальные свободные слоты может занять
+любая группа, так что при отсутствии логинов и записи чтения используют
+весь пул. Освободившийся слот получает ожидающий запрос с наивысшим
+приоритетом (auth > write > read), поэтому логины и запись переживают шторм
+чтений. У каждой группы своя ограниченная очередь ожидания: если она
+заполнена или ожидание превысило дедлайн, запрос сразу получает 503 с
+Retry-After. Health-check не проходит через очереди вовсе.
+"""
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Меньшее значение - более высокий приоритет
+PRIORITIES = {"auth": 0, "write": 1, "read": 2}
+
+# Маршруты, которые обслуживаются всегда
+BYPASS_PATHS = {"/health", "/"}
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class Rejected(Exception):
+    """Запрос не допущен: очередь переполнена или истек дедлайн"""
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "group", "future")
+
+    def __init__(self, priority: int, seq: int, group: str, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.group = group
+        self.future = future
+
+
+class AdmissionController:
+    """Лимиты параллельности с приоритетной очередью ожидания"""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        reserved: Dict[str, int],
+        queue_sizes: Dict[str, int],
+        queue_timeout: float,
+    ):
+        self.max_concurrency = max_concurrency
+        self.reserved = reserved
+        self.queue_sizes = queue_sizes
+        self.queue_timeout = queue_timeout
+        self.active_total = 0
+        self.active: Dict[str, int] = {group: 0 for group in PRIORITIES}
+        self.waiting: Dict[str, int] = {group: 0 for group in PRIORITIES}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _can_run(self, group: str) -> bool:
+        """Есть свободный слот сверх незанятого резерва других групп"""
+        held = sum(
+            max(0, slots - self.active[other])
+            for other, slots in self.reserved.items()
+            if other != group
+        )
+        return self.max_concurrency - self.active_total > held
+
+    def _admit(self, group: str) -> None:
+        self.active_total += 1
+        self.active[group] += 1
+
+    def _has_waiter_ahead(self, group: str) -> bool:
+        """Есть ли ожидающий запрос, который должен пройти раньше"""
+        priority = PRIORITIES[group]
+        return any(
+            waiter.priority <= priority and self._can_run(waiter.group)
+            for waiter in self._waiters
+        )
+
+    async def acquire(self, group: str) -> None:
+        if self._can_run(group) and not self._has_waiter_ahead(group):
+            self._admit(group)
+            return
+
+        if self.waiting[group] >= self.queue_sizes.get(group, 0):
+            raise Rejected(group)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = _Waiter(PRIORITIES[group], next(self._seq), group, future)
+        self._waiters.append(waiter)
+        self.waiting[group] += 1
+        # Не wait_for: он теряет отмену, пришедшую одновременно с выдачей слота
+        deadline = loop.call_later(self.queue_timeout, self._expire, waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Слот выдали одновременно с отменой - возвращаем его
+                self.release(group)
+            raise
+        finally:
+            deadline.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.waiting[group] -= 1
+
+    @staticmethod
+    def _expire(waiter: _Waiter) -> None:
+        """Дедлайн ожидания истек, а слот так и не выдали"""
+        if not waiter.future.done():
+            waiter.future.set_exception(Rejected(waiter.group))
+
+    def release(self, group: str) -> None:
+        self.active_total -= 1
+        self.active[group] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Раздать свободные слоты ожидающим в порядке приоритета"""
+        for waiter in sorted(self._waiters, key=lambda w: (w.priority, w.seq)):
+            if self.active_total >= self.max_concurrency:
+                return
+            if waiter.future.done() or not self._can_run(waiter.group):
+                continue
+            self._waiters.remove(waiter)
+            self._admit(waiter.group)
+            waiter.future.set_result(None)
+
+
+def route_group(scope: Scope) -> Optional[str]:
+    """Группа запроса или None, если запрос не ограничивается"""
+    path = scope["path"]
+    if path in BYPASS_PATHS:
+        return None
+    if "/auth/" in path:
+        return "auth"
+    if scope["method"] in READ_METHODS:
+        return "read"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware, пропускающий HTTP-запросы через AdmissionController"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, retry_after: int = 1):
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        group = route_group(scope)
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(group)
+        except Rejected:
+            response = JSONResponse(
+                {"detail": "Service overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(group)
@@ -0,0 +1,334 @@
+"""
+Сжатие ответов с согласованием кодировки.
+
+Кодировка выбирается по Accept-Encoding клиента из доступных на сервере:
+zstd (пакет zstandard), br (пакет brotli) и gzip. Ответ, целиком пришедший
+одним сообщением и меньше minimum_size, отдается как есть без лишних
+копирований.
+
+StreamingResponse сжимается потоково. Пока не набралось minimum_size байт,
+чанки копятся; поток, который закончился раньше, уходит без сжатия.
+Компрессор дожимается flush-ем не на каждом чанке, а раз в flush_size байт
+входа, чтобы не терять степень сжатия на мелких строках выгрузки. Если
+генератор молчит flush_interval с последнего flush, накопленное отправляется
+по таймеру (при необходимости поток начинает сжиматься раньше minimum_size):
+интервал решает только, когда клиент получит данные, но не отключает сжатие.
+Так событие SSE не ждет следующего события.
+"""
+import asyncio
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - необязательная зависимость
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - необязательная зависимость
+    brotli = None
+
+# Подстроки Content-Type, которые имеет смысл сжимать (json покрывает и ndjson)
+COMPRESSIBLE_TYPES = ("text/", "json", "xml", "javascript", "csv")
+
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+
+
+class _Compressor:
+    """Потоковый компрессор: compress() + flush() для чанка, finish() в конце"""
+
+    def __init__(
+        self,
+        compress: Callable[[bytes], bytes],
+        flush: Callable[[], bytes],
+        finish: Callable[[], bytes],
+    ):
+        self.compress = compress
+        self.flush = flush
+        self.finish = finish
+
+
+def _gzip(level: int) -> _Compressor:
+    compressobj = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return _Compressor(
+        compressobj.compress,
+        lambda: compressobj.flush(zlib.Z_SYNC_FLUSH),
+        compressobj.flush,
+    )
+
+
+def _zstd(level: int) -> _Compressor:
+    compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+    return _Compressor(
+        compressobj.compress,
+        lambda: compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+        compressobj.flush,
+    )
+
+
+def _brotli(level: int) -> _Compressor:
+    compressor = brotli.Compressor(quality=level)
+    return _Compressor(compressor.process, compressor.flush, compressor.finish)
+
+
+def available_encodings() -> List[str]:
+    """Кодировки, доступные на сервере, в порядке предпочтения"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+_FACTORIES = {"zstd": _zstd, "br": _brotli, "gzip": _gzip}
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Accept-Encoding -> {кодировка: q}"""
+    accepted: Dict[str, float] = {}
+    for item in header.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(header: str, encodings: List[str]) -> Optional[str]:
+    """Лучшая кодировка: наибольший q клиента, при равенстве - порядок сервера"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best: Optional[Tuple[float, int]] = None
+    chosen = None
+    for rank, encoding in enumerate(encodings):
+        q = accepted.get(encoding, wildcard)
+        if q <= 0:
+            continue
+        key = (q, -rank)
+        if best is None or key > best:
+            best, chosen = key, encoding
+    return chosen
+
+
+class CompressionMiddleware:
+    """ASGI middleware сжатия ответов"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        encodings: Optional[List[str]] = None,
+        flush_size: int = 16384,
+        flush_interval: float = 0.1,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.encodings = encodings or available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send, encoding, self.levels[encoding],
+            self.minimum_size, self.flush_size, self.flush_interval,
+        )
+        try:
+            await self.app(scope, receive, responder.send)
+        finally:
+            responder.close()
+
+
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        level: int,
+        minimum_size: int,
+        flush_size: int,
+        flush_interval: float,
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        # Чанки потока до решения о сжатии
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        # Байты входа, отданные компрессору после последнего flush
+        self.unflushed = 0
+        # Момент, когда клиент последний раз получил все данные
+        self.last_flush = 0.0
+        # Таймер flush-а и генератор отправляют данные по очереди
+        self.lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Ждем тело, чтобы решить, сжимать ли ответ
+            self.start_message = message
+            self.last_flush = time.monotonic()
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not any(kind in content_type for kind in COMPRESSIBLE_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        async with self.lock:
+            if self.compressor is None:
+                if not more_body and not self.pending and len(body) < self.minimum_size:
+                    # Маленький ответ целиком - отдаем без сжатия и без копирования
+                    self.passthrough = True
+                    await self._send_start()
+                    await self._send(message)
+                    return
+
+                self.pending.append(body)
+                self.pending_size += len(body)
+                if not more_body:
+                    await self._send_whole()
+                    return
+                if self.pending_size < self.minimum_size:
+                    self._schedule_flush()
+                    return
+                chunk = await self._start_stream()
+            else:
+                chunk = self.compressor.compress(body) if body else b""
+                self.unflushed += len(body)
+
+            if not more_body:
+                self.close()
+                self.unflushed = 0
+                await self._send({"type": "http.response.body", "body": chunk + self.compressor.finish()})
+                return
+
+            if self.unflushed >= self.flush_size:
+                chunk += self._flush()
+            if chunk:
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+            if self.unflushed:
+                self._schedule_flush()
+
+    async def _send_whole(self) -> None:
+        """Поток закончился до решения о сжатии: отдать накопленное одним сообщением"""
+        body = b"".join(self.pending)
+        self.pending = []
+        self.close()
+        if len(body) < self.minimum_size:
+            # Короткий поток - сжатие не окупится
+            self.passthrough = True
+            await self._send_start()
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        self.compressor = _FACTORIES[self.encoding](self.level)
+        compressed = self.compressor.compress(body) + self.compressor.finish()
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        headers["Content-Length"] = str(len(compressed))
+        await self._send_start()
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _start_stream(self) -> bytes:
+        """Отправить заголовки сжатого потока и вернуть сжатые накопленные чанки"""
+        self.compressor = _FACTORIES[self.encoding](self.level)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # Длина потокового ответа заранее неизвестна
+        del headers["Content-Length"]
+        await self._send_start()
+
+        body = b"".join(self.pending)
+        self.pending = []
+        self.pending_size = 0
+        self.unflushed = len(body)
+        return self.compressor.compress(body)
+
+    def _flush(self) -> bytes:
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+        return self.compressor.flush()
+
+    def _schedule_flush(self) -> None:
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self._flush_when_idle())
+
+    async def _flush_when_idle(self) -> None:
+        """flush, если с последнего flush прошло flush_interval, а данные еще в буфере"""
+        while True:
+            delay = self.last_flush + self.flush_interval - time.monotonic()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        async with self.lock:
+            if self.compressor is None:
+                if not self.pending:
+                    return
+                chunk = await self._start_stream()
+            elif self.unflushed:
+                chunk = b""
+            else:
+                return
+            chunk += self._flush()
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    async def _send_start(self) -> None:
+        if self.start_message is not None:
+            await self._send(self.start_message)
+            self.start_message = None
+
+    def close(self) -> None:
+        """Остановить таймер flush-а"""
+        if self.flush_task is not None and not self.flush_task.done():
+            self.flush_task.cancel()
@@ -13,7 +13,9 @@ DATABASE_URL = "sqlite+aiosqlite:///./crm.db"
 # Создаем асинхронный движок
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,
+    # SQL логируется через app.core.logger (settings.LOG_SQL), echo добавил бы
+    # собственный синхронный обработчик
+    echo=False,
     future=True
 )
 
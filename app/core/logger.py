@@ -0,0 +1,195 @@
+"""
+Неблокирующее структурированное логирование.
+
+Обработчики в event loop только подставляют аргументы в сообщение и кладут
+запись в очередь (стандартный QueueHandler), а кодирование в JSON и запись в
+поток выполняет QueueListener в отдельном потоке. Логгеры uvicorn тоже
+направляются в очередь. Каждая запись получает request_id текущего запроса. Объемные логи
+(SQL и access-лог) сэмплируются с настраиваемой долей; предупреждения и
+ошибки проходят всегда.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional, TextIO
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+ACCESS_LOGGER = "app.access"
+SQL_LOGGER = "sqlalchemy.engine"
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error")
+UVICORN_ACCESS_LOGGER = "uvicorn.access"
+
+# Стандартные атрибуты LogRecord, которые не попадают в JSON как extra
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет в запись request_id текущего запроса"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей ниже WARNING для указанных логгеров"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates.items():
+            if record.name.startswith(prefix):
+                return rate >= 1.0 or random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    sql: bool = False,
+    sql_sample_rate: float = 0.01,
+    access_sample_rate: float = 1.0,
+    stream: Optional[TextIO] = None,
+) -> logging.handlers.QueueListener:
+    """Настроить корневой логгер на очередь и запустить QueueListener"""
+    global _listener
+    _route_uvicorn_loggers()
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(stream or sys.stderr)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+        ))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    # Стандартный prepare() подставляет args и текст исключения еще в event loop,
+    # поэтому в другой поток уходит готовая строка, а не изменяемые объекты
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter({
+        SQL_LOGGER: sql_sample_rate,
+        ACCESS_LOGGER: access_sample_rate,
+    }))
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    logging.getLogger(SQL_LOGGER).setLevel(logging.INFO if sql else logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def _route_uvicorn_loggers() -> None:
+    """
+    Убрать обработчики, которые uvicorn ставит через dictConfig.
+
+    Иначе uvicorn пишет в stderr прямо из event loop, а каждый запрос
+    попадает в лог дважды вместе с AccessLogMiddleware.
+    """
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    access_logger = logging.getLogger(UVICORN_ACCESS_LOGGER)
+    access_logger.handlers = []
+    access_logger.propagate = False
+    access_logger.disabled = True
+
+
+def shutdown_logging() -> None:
+    """Дописать очередь и остановить QueueListener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class AccessLogMiddleware:
+    """ASGI middleware: request_id для каждого запроса и access-лог"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.logger = logging.getLogger(ACCESS_LOGGER)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    },
+                )
+            request_id_var.reset(token)
@@ -0,0 +1,380 @@
+"""
+Шардирование данных тенантов по user_id.
+
+Пользователи и карта размещения (tenant_shards) живут в основной БД,
+контакты и сделки - в шарде тенанта. Шард 0 - это основная БД, остальные
+шарды задаются в settings.SHARD_DATABASE_URLS (отдельные файлы SQLite локально,
+отдельные базы Postgres в продакшене). У каждого шарда свой движок и своя
+блокировка записи, поэтому запись масштабируется с числом шардов.
+
+Тенант без записи в карте живет в шарде 0: так пользователи, созданные
+до включения шардов, продолжают видеть свои данные. Новые пользователи
+закрепляются за шардом по user_id % N при регистрации.
+
+Идентификаторы контактов и сделок выдаются блоками из общей таблицы
+id_blocks в основной БД, поэтому они уникальны во всех шардах и
+сохраняются при переносе тенанта.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import select, func, delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import get_current_user
+from app.models.user import User
+from app.models.contact import Contact
+from app.models.deal import Deal
+from app.models.tenant_shard import TenantShard
+from app.models.id_block import IdBlock
+
+# Таблицы, которые создаются в каждом шарде. Таблица users нужна для внешних
+# ключей, в шарде она хранит только заглушки пользователей без пароля.
+SHARD_TABLES = [User.__table__, Contact.__table__, Deal.__table__]
+
+# Сколько идентификаторов процесс резервирует за одно обращение к основной БД
+ID_BLOCK_SIZE = 100
+
+
+class TenantMovingError(Exception):
+    """Тенант сейчас переносится между шардами"""
+
+
+class ShardRouter:
+    """Маршрутизация тенантов по шардам"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        map_ttl: float,
+        main_engine: Optional[AsyncEngine] = None,
+        cache_size: int = 10000,
+    ):
+        main_engine = main_engine or engine
+        self.engines: List[AsyncEngine] = [main_engine]
+        self.session_makers: List[async_sessionmaker] = [
+            async_sessionmaker(main_engine, class_=AsyncSession, expire_on_commit=False)
+        ]
+        for url in urls:
+            shard_engine = create_async_engine(url, future=True)
+            self.engines.append(shard_engine)
+            self.session_makers.append(
+                async_sessionmaker(shard_engine, class_=AsyncSession, expire_on_commit=False)
+            )
+        self.map_ttl = map_ttl
+        self.cache_size = cache_size
+        # user_id -> (шард, момент истечения записи); LRU не больше cache_size
+        self._cache: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        # (шард, user_id), для которых заглушка пользователя уже создана; тоже LRU
+        self._stubbed: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+        # таблица -> (следующий id, конец зарезервированного блока)
+        self._id_ranges: Dict[str, Tuple[int, int]] = {}
+        self._id_lock = asyncio.Lock()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.engines)
+
+    def session(self, shard: int) -> AsyncSession:
+        """Новая сессия к указанному шарду"""
+        return self.session_makers[shard]()
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.pop(user_id, None)
+
+    def _cached_shard(self, user_id: int, now: float) -> Optional[int]:
+        """Шард из кэша; просроченная запись удаляется"""
+        cached = self._cache.get(user_id)
+        if cached is None:
+            return None
+        if cached[1] <= now:
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return cached[0]
+
+    def _remember(self, cache: OrderedDict, key, value) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    async def register_tenant(self, session: AsyncSession, user_id: int) -> int:
+        """Закрепить нового пользователя за шардом (session - к основной БД)"""
+        shard = user_id % self.shard_count
+        session.add(TenantShard(user_id=user_id, shard=shard))
+        await session.commit()
+        return shard
+
+    async def shard_for(self, user_id: int) -> int:
+        """Номер шарда тенанта; тенанты без записи в карте живут в шарде 0"""
+        if self.shard_count == 1:
+            return 0
+
+        now = time.monotonic()
+        cached = self._cached_shard(user_id, now)
+        if cached is not None:
+            return cached
+
+        async with self.session(0) as session:
+            placement = await session.get(TenantShard, user_id)
+            if placement is None:
+                shard = 0
+            elif placement.is_moving:
+                raise TenantMovingError(user_id)
+            else:
+                shard = placement.shard
+
+        self._remember(self._cache, user_id, (shard, now + self.map_ttl))
+        return shard
+
+    async def next_id(self, model) -> int:
+        """Идентификатор новой строки, уникальный во всех шардах"""
+        name = model.__tablename__
+        async with self._id_lock:
+            next_id, end = self._id_ranges.get(name, (0, 0))
+            if next_id >= end:
+                next_id, end = await self._reserve_ids(model)
+            self._id_ranges[name] = (next_id + 1, end)
+            return next_id
+
+    async def _reserve_ids(self, model) -> Tuple[int, int]:
+        """Зарезервировать блок идентификаторов в основной БД"""
+        name = model.__tablename__
+        async with self.session(0) as session:
+            while True:
+                start = await session.scalar(select(IdBlock.next_id).where(IdBlock.name == name))
+                if start is None:
+                    # Первый блок начинается после всех уже существующих строк
+                    start = await self._max_id(model) + 1
+                    session.add(IdBlock(name=name, next_id=start + ID_BLOCK_SIZE))
+                    try:
+                        await session.commit()
+                        return start, start + ID_BLOCK_SIZE
+                    except IntegrityError:
+                        await session.rollback()
+                        continue
+
+                # Оптимистичная блокировка: блок наш, если next_id не успел измениться
+                result = await session.execute(
+                    update(IdBlock)
+                    .where(IdBlock.name == name, IdBlock.next_id == start)
+                    .values(next_id=start + ID_BLOCK_SIZE)
+                )
+                await session.commit()
+                if result.rowcount == 1:
+                    return start, start + ID_BLOCK_SIZE
+
+    async def _max_id(self, model) -> int:
+        max_id = 0
+        for shard in range(self.shard_count):
+            async with self.session(shard) as session:
+                max_id = max(max_id, await session.scalar(select(func.max(model.id))) or 0)
+        return max_id
+
+    async def ensure_user_stub(self, session: AsyncSession, shard: int, user: User) -> None:
+        """Создать в шарде заглушку пользователя для внешних ключей"""
+        if shard == 0 or (shard, user.id) in self._stubbed:
+            return
+        await session.merge(User(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            hashed_password="!",
+            is_active=user.is_active,
+        ))
+        await session.commit()
+        self._remember(self._stubbed, (shard, user.id), None)
+
+    async def create_tables(self) -> None:
+        """Создать таблицы тенантов во всех дополнительных шардах"""
+        for shard_engine in self.engines[1:]:
+            async with shard_engine.begin() as conn:
+                await conn.run_sync(
+                    lambda sync_conn: User.metadata.create_all(sync_conn, tables=SHARD_TABLES)
+                )
+
+    async def dispose(self) -> None:
+        """Закрыть соединения дополнительных шардов (основной движок закрывает main)"""
+        for shard_engine in self.engines[1:]:
+            await shard_engine.dispose()
+
+    # Инструменты обслуживания
+
+    async def backfill(self) -> int:
+        """Закрепить за шардом 0 всех пользователей без записи в карте"""
+        async with self.session(0) as session:
+            result = await session.execute(
+                select(User.id)
+                .outerjoin(TenantShard, TenantShard.user_id == User.id)
+                .where(TenantShard.user_id.is_(None))
+            )
+            user_ids = result.scalars().all()
+            for user_id in user_ids:
+                session.add(TenantShard(user_id=user_id, shard=0))
+            await session.commit()
+        return len(user_ids)
+
+    async def tenant_loads(self) -> List[Dict[int, int]]:
+        """Количество строк (контакты + сделки) по тенантам в каждом шарде"""
+        loads: List[Dict[int, int]] = []
+        for shard in range(self.shard_count):
+            shard_load: Dict[int, int] = {}
+            async with self.session(shard) as session:
+                for model in (Contact, Deal):
+                    result = await session.execute(
+                        select(model.user_id, func.count()).group_by(model.user_id)
+                    )
+                    for user_id, rows in result.all():
+                        shard_load[user_id] = shard_load.get(user_id, 0) + rows
+            loads.append(shard_load)
+        return loads
+
+    async def move_tenant(self, user_id: int, target: int) -> int:
+        """
+        Перенести контакты и сделки тенанта в другой шард.
+
+        На время переноса тенант помечается как переносимый, и его запросы
+        получают 503. Идентификаторы контактов и сделок сохраняются.
+        Возвращает число перенесенных строк.
+        """
+        if not 0 <= target < self.shard_count:
+            raise ValueError(f"Shard {target} does not exist")
+
+        async with self.session(0) as session:
+            placement = await session.get(TenantShard, user_id)
+            user = await session.get(User, user_id)
+            if user is None:
+                raise ValueError(f"User {user_id} not found")
+            if placement is None:
+                placement = TenantShard(user_id=user_id, shard=0)
+                session.add(placement)
+            source = placement.shard
+            if source == target:
+                await session.commit()
+                return 0
+            placement.is_moving = True
+            await session.commit()
+
+        # Ждем, пока закэшированное размещение истечет во всех процессах
+        self.invalidate(user_id)
+        await asyncio.sleep(self.map_ttl)
+
+        moved = 0
+        try:
+            async with self.session(source) as src, self.session(target) as dst:
+                await self.ensure_user_stub(dst, target, user)
+
+                contacts = (await src.execute(
+                    select(Contact).where(Contact.user_id == user_id)
+                )).scalars().all()
+                for contact in contacts:
+                    dst.add(Contact(**_row_data(contact)))
+                await dst.flush()
+
+                deals = (await src.execute(
+                    select(Deal).where(Deal.user_id == user_id)
+                )).scalars().all()
+                for deal in deals:
+                    dst.add(Deal(**_row_data(deal)))
+
+                await dst.commit()
+                moved = len(contacts) + len(deals)
+
+                # Переключаем карту и только потом чистим исходный шард
+                async with self.session(0) as session:
+                    placement = await session.get(TenantShard, user_id)
+                    placement.shard = target
+                    placement.is_moving = False
+                    await session.commit()
+
+                await src.execute(delete(Deal).where(Deal.user_id == user_id))
+                await src.execute(delete(Contact).where(Contact.user_id == user_id))
+                await src.commit()
+        finally:
+            async with self.session(0) as session:
+                placement = await session.get(TenantShard, user_id)
+                if placement.is_moving:
+                    placement.is_moving = False
+                    await session.commit()
+            self.invalidate(user_id)
+
+        return moved
+
+    async def plan_rebalance(self) -> List[Tuple[int, int, int]]:
+        """
+        План выравнивания шардов: список (user_id, из шарда, в шард).
+
+        Жадно переносим самого крупного тенанта из самого загруженного шарда
+        в самый свободный, пока это уменьшает разрыв между ними.
+        """
+        loads = await self.tenant_loads()
+        moves: List[Tuple[int, int, int]] = []
+        while True:
+            totals = [sum(shard_load.values()) for shard_load in loads]
+            busiest = max(range(len(totals)), key=totals.__getitem__)
+            idlest = min(range(len(totals)), key=totals.__getitem__)
+            gap = totals[busiest] - totals[idlest]
+            candidates = [
+                (rows, user_id)
+                for user_id, rows in loads[busiest].items()
+                if 0 < rows < gap
+            ]
+            if not candidates:
+                return moves
+            rows, user_id = max(candidates)
+            loads[idlest][user_id] = loads[busiest].pop(user_id)
+            moves.append((user_id, busiest, idlest))
+
+    async def rebalance(self) -> List[Tuple[int, int, int]]:
+        moves = await self.plan_rebalance()
+        for user_id, _, target in moves:
+            await self.move_tenant(user_id, target)
+        return moves
+
+
+def _row_data(obj) -> dict:
+    """Значения всех колонок строки, включая первичный ключ"""
+    return {
+        column.name: getattr(obj, column.name)
+        for column in obj.__table__.columns
+    }
+
+
+shard_router = ShardRouter(
+    settings.SHARD_DATABASE_URLS,
+    settings.SHARD_MAP_TTL_SECONDS,
+    cache_size=settings.SHARD_MAP_CACHE_SIZE,
+)
+
+
+# Dependency для получения сессии к шарду текущего пользователя
+async def get_tenant_db(
+    current_user: User = Depends(get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия к шарду, в котором лежат данные текущего пользователя"""
+    try:
+        shard = await shard_router.shard_for(current_user.id)
+    except TenantMovingError:
+        raise HTTPException(
+            status_code=503,
+            detail="Tenant data is being moved, retry later",
+            headers={"Retry-After": str(int(settings.SHARD_MAP_TTL_SECONDS) or 1)},
+        )
+
+    async with shard_router.session(shard) as session:
+        try:
+            await shard_router.ensure_user_stub(session, shard, current_user)
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
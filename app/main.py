@@ -9,12 +9,20 @@ from app.api.v1 import contacts, deals, auth
 # from app.api import websocket  # ← пока не существует
 
 from app.core.database import engine, Base
+from app.core.sharding import shard_router
+from app.core.config import settings
+from app.core.admission import AdmissionController, AdmissionMiddleware
+from app.core.logger import setup_logging, AccessLogMiddleware
+from app.core.compression import CompressionMiddleware
 # from app.core.security import create_first_superuser  # ← пока не используем
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+# Настройка логирования (запись в поток вынесена из event loop)
+setup_logging(
+    level=settings.LOG_LEVEL,
+    json_format=settings.LOG_JSON,
+    sql=settings.LOG_SQL,
+    sql_sample_rate=settings.LOG_SQL_SAMPLE_RATE,
+    access_sample_rate=settings.LOG_ACCESS_SAMPLE_RATE,
 )
 logger = logging.getLogger(__name__)
 
@@ -29,6 +37,7 @@ async def lifespan(app: FastAPI):
     # Создаем таблицы в БД (асинхронно)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await shard_router.create_tables()
     
     logger.info("Database tables created successfully!")
     
@@ -38,6 +47,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down CRM application...")
+    await shard_router.dispose()
     await engine.dispose()  # Закрываем соединения с БД
     logger.info("CRM application shut down.")
 
@@ -50,6 +60,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Admission control: ограничиваем параллельность до CORS, чтобы отказы 503
+# тоже получали CORS-заголовки
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+            reserved=settings.ADMISSION_RESERVED,
+            queue_sizes=settings.ADMISSION_QUEUE_SIZES,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        ),
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+    )
+
 # Настройка CORS
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +83,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие списков и выгрузок
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        levels=settings.COMPRESSION_LEVELS,
+        flush_size=settings.COMPRESSION_FLUSH_SIZE,
+        flush_interval=settings.COMPRESSION_FLUSH_INTERVAL,
+    )
+
+# Access-лог и request_id - самый внешний слой, чтобы учитывать и отказы 503
+app.add_middleware(AccessLogMiddleware)
+
 # Подключаем только существующие роутеры
 app.include_router(
     contacts.router,
@@ -105,4 +142,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
+        # Логгеры uvicorn перенастраивает setup_logging, access-лог пишет AccessLogMiddleware
+        log_config=None,
+        access_log=False,
     )
\ No newline at end of file
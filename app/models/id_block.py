@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+
+from app.core.database import Base
+
+class IdBlock(Base):
+    """Следующий свободный идентификатор для шардируемой таблицы (общий для всех шардов)"""
+    __tablename__ = "id_blocks"
+
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Boolean, Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+class TenantShard(Base):
+    """Карта размещения тенантов: в каком шарде лежат контакты и сделки пользователя"""
+    __tablename__ = "tenant_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard = Column(Integer, nullable=False, index=True)
+    # Пока тенант переносится, запросы к его данным отклоняются
+    is_moving = Column(Boolean, default=False, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
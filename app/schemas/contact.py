@@ -2,6 +2,8 @@ from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel, EmailStr
 
+from app.schemas.partial import partial_model
+
 class ContactBase(BaseModel):
     full_name: str
     email: Optional[EmailStr] = None
@@ -28,4 +30,8 @@ class ContactResponse(ContactBase):
     updated_at: Optional[datetime]
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Ответ с выбранными полями (fields=); невыбранные поля не попадают в JSON
+ContactPartial = partial_model(ContactResponse, "ContactPartial")
@@ -2,6 +2,8 @@ from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel
 
+from app.schemas.partial import partial_model
+
 
 class DealBase(BaseModel):
     title: str
@@ -32,4 +34,8 @@ class DealResponse(DealBase):
     updated_at: Optional[datetime]
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Ответ с выбранными полями (fields=); невыбранные поля не попадают в JSON
+DealPartial = partial_model(DealResponse, "DealPartial")
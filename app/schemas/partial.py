@@ -0,0 +1,12 @@
+from typing import Optional, Type
+
+from pydantic import BaseModel, create_model
+
+
+def partial_model(model: Type[BaseModel], name: str) -> Type[BaseModel]:
+    """Копия схемы ответа, где все поля, кроме id, необязательны (для fields=)"""
+    fields = {
+        field_name: (field.annotation, ...) if field_name == "id" else (Optional[field.annotation], None)
+        for field_name, field in model.model_fields.items()
+    }
+    return create_model(name, **fields)
@@ -0,0 +1,73 @@
+"""
+Обслуживание шардов тенантов.
+
+    python -m app.scripts.shards status
+    python -m app.scripts.shards backfill
+    python -m app.scripts.shards move <user_id> <shard>
+    python -m app.scripts.shards rebalance [--dry-run]
+"""
+import argparse
+import asyncio
+
+from app.core.database import engine, Base
+from app.core.sharding import shard_router
+
+
+async def status() -> None:
+    loads = await shard_router.tenant_loads()
+    for shard, shard_load in enumerate(loads):
+        print(f"shard {shard}: {len(shard_load)} tenants, {sum(shard_load.values())} rows")
+
+
+async def backfill() -> None:
+    pinned = await shard_router.backfill()
+    print(f"Pinned {pinned} tenants to shard 0")
+
+
+async def move(user_id: int, shard: int) -> None:
+    moved = await shard_router.move_tenant(user_id, shard)
+    print(f"Moved tenant {user_id} to shard {shard}: {moved} rows")
+
+
+async def rebalance(dry_run: bool) -> None:
+    if dry_run:
+        moves = await shard_router.plan_rebalance()
+    else:
+        moves = await shard_router.rebalance()
+    for user_id, source, target in moves:
+        print(f"tenant {user_id}: shard {source} -> shard {target}")
+    if not moves:
+        print("Shards are balanced")
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await shard_router.create_tables()
+
+    try:
+        if args.command == "status":
+            await status()
+        elif args.command == "backfill":
+            await backfill()
+        elif args.command == "move":
+            await move(args.user_id, args.shard)
+        elif args.command == "rebalance":
+            await rebalance(args.dry_run)
+    finally:
+        await shard_router.dispose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Управление шардами тенантов")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Нагрузка по шардам")
+    commands.add_parser("backfill", help="Закрепить существующих пользователей за шардом 0")
+    move_parser = commands.add_parser("move", help="Перенести тенанта в другой шард")
+    move_parser.add_argument("user_id", type=int)
+    move_parser.add_argument("shard", type=int)
+    rebalance_parser = commands.add_parser("rebalance", help="Выровнять шарды по числу строк")
+    rebalance_parser.add_argument("--dry-run", action="store_true")
+
+    asyncio.run(main(parser.parse_args()))
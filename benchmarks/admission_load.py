@@ -0,0 +1,251 @@
+"""
+Нагрузочный тест admission control.
+
+Сервер запускается через uvicorn в отдельном процессе с теми же группами
+маршрутов, что и CRM, но вместо БД использует модель пула соединений:
+семафор на POOL_SIZE слотов с таймаутом ожидания и фиксированным временем
+обработки. Клиенты работают в своих процессах и ходят по HTTP, поэтому
+генератор нагрузки не делит event loop с сервером. Для каждого уровня
+параллельности клиентов меряем goodput - число успешных ответов в секунду,
+уложившихся в SLA, - с admission control и без него; late - успешные
+ответы, не уложившиеся в SLA, failed - ошибки пула и соединения. Резерв, очереди и
+дедлайн берутся из settings, SLA = 2 x ADMISSION_QUEUE_TIMEOUT.
+
+    python -m benchmarks.admission_load
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.core.admission import AdmissionController, AdmissionMiddleware
+from app.core.config import settings
+
+# Пул и admission control настроены так же, как в settings
+POOL_SIZE = settings.ADMISSION_MAX_CONCURRENCY
+POOL_TIMEOUT = 3.0
+# Время запроса к БД: при 1-2 CPU узким местом должен быть пул, а не CPU
+SERVICE_TIME = 0.1
+SLA = 2 * settings.ADMISSION_QUEUE_TIMEOUT
+DURATION = 5.0
+CLIENTS = [10, 25, 50, 100, 200, 400]
+CLIENT_PROCESSES = 2
+PORT = 8765
+# Доли запросов: шторм чтений с небольшой долей записи и логинов
+MIX = [("read", 0.80), ("write", 0.15), ("auth", 0.05)]
+
+
+def build_app(admission: bool) -> FastAPI:
+    app = FastAPI()
+    pool = asyncio.Semaphore(POOL_SIZE)
+
+    async def use_pool():
+        try:
+            await asyncio.wait_for(pool.acquire(), POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(500, "QueuePool limit reached, connection timed out")
+        try:
+            await asyncio.sleep(SERVICE_TIME)
+        finally:
+            pool.release()
+
+    @app.get("/api/v1/contacts/")
+    async def read_contacts():
+        await use_pool()
+        return []
+
+    @app.post("/api/v1/contacts/")
+    async def create_contact():
+        await use_pool()
+        return {"id": 1}
+
+    @app.post("/api/v1/auth/login")
+    async def login():
+        await use_pool()
+        return {"access_token": "token", "token_type": "bearer"}
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    if admission:
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=AdmissionController(
+                max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+                reserved=settings.ADMISSION_RESERVED,
+                queue_sizes=settings.ADMISSION_QUEUE_SIZES,
+                queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+            ),
+            retry_after=settings.ADMISSION_RETRY_AFTER,
+        )
+    return app
+
+
+def create_app() -> FastAPI:
+    """Фабрика для uvicorn --factory, режим задается BENCH_ADMISSION"""
+    return build_app(os.environ.get("BENCH_ADMISSION") == "1")
+
+
+REQUESTS = {
+    "read": ("GET", "/api/v1/contacts/"),
+    "write": ("POST", "/api/v1/contacts/"),
+    "auth": ("POST", "/api/v1/auth/login"),
+}
+
+
+def start_server(admission: bool) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "benchmarks.admission_load:create_app",
+            "--factory", "--port", str(PORT), "--log-level", "warning", "--no-access-log",
+        ],
+        env={**os.environ, "BENCH_ADMISSION": "1" if admission else "0"},
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/health")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("benchmark server did not start")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    server.wait(10)
+
+
+class Connection:
+    """
+    Минимальный HTTP/1.1-клиент с keep-alive, по соединению на клиента.
+
+    httpx на 1-2 CPU сам становится узким местом и добавляет секунды
+    задержки, которых нет на сервере.
+    """
+
+    def __init__(self):
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", PORT)
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: 0\r\n\r\n".encode()
+        )
+        try:
+            head = await self.reader.readuntil(b"\r\n\r\n")
+            status_line, *lines = head.decode("latin-1").split("\r\n")
+            headers = {}
+            for line in lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+        except (OSError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        if headers.get("connection") == "close":
+            self.close()
+        return int(status_line.split()[1]), headers
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def client_loop(deadline, stats):
+    groups = [group for group, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    connection = Connection()
+    while time.monotonic() < deadline:
+        group = random.choices(groups, weights)[0]
+        method, url = REQUESTS[group]
+        started = time.monotonic()
+        try:
+            status, headers = await connection.request(method, url)
+        except (OSError, asyncio.IncompleteReadError):
+            stats[group]["failed"] += 1
+            continue
+        elapsed = time.monotonic() - started
+        if status == 200:
+            stats[group]["good" if elapsed <= SLA else "late"] += 1
+        elif status == 503:
+            stats[group]["shed"] += 1
+            # Клиент уважает Retry-After (с джиттером)
+            retry_after = float(headers.get("retry-after", 1))
+            await asyncio.sleep(retry_after * random.uniform(0.5, 1.0))
+        else:
+            stats[group]["failed"] += 1
+    connection.close()
+
+
+async def drive(clients: int, deadline: float) -> dict:
+    stats = defaultdict(lambda: defaultdict(int))
+    await asyncio.gather(*(client_loop(deadline, stats) for _ in range(clients)))
+    return {group: dict(counts) for group, counts in stats.items()}
+
+
+def client_process(args) -> dict:
+    """Часть клиентов в отдельном процессе"""
+    clients, deadline = args
+    return asyncio.run(drive(clients, deadline))
+
+
+def run(admission: bool, clients: int) -> dict:
+    server = start_server(admission)
+    try:
+        # Общий дедлайн по wall clock: процессы клиентов стартуют не одновременно
+        deadline = time.monotonic() + DURATION
+        shares = [clients // CLIENT_PROCESSES] * CLIENT_PROCESSES
+        shares[0] += clients % CLIENT_PROCESSES
+        with multiprocessing.Pool(CLIENT_PROCESSES) as pool:
+            parts = pool.map(client_process, [(share, deadline) for share in shares])
+    finally:
+        stop_server(server)
+
+    stats = defaultdict(lambda: defaultdict(int))
+    for part in parts:
+        for group, counts in part.items():
+            for key, value in counts.items():
+                stats[group][key] += value
+    return stats
+
+
+def main():
+    capacity = POOL_SIZE / SERVICE_TIME
+    print(
+        f"Pool capacity ~{capacity:.0f} req/s, SLA {SLA}s, {DURATION}s per run, "
+        f"{CLIENT_PROCESSES} client processes, {os.cpu_count()} CPU\n"
+    )
+    header = f"{'mode':<10}{'clients':>8}{'goodput/s':>11}{'read':>8}{'write':>8}{'auth':>8}{'late':>8}{'shed':>8}{'failed':>8}"
+    print(header)
+    print("-" * len(header))
+    for admission in (False, True):
+        mode = "admission" if admission else "baseline"
+        for clients in CLIENTS:
+            stats = run(admission, clients)
+            good = {group: stats[group]["good"] / DURATION for group in REQUESTS}
+            late = sum(stats[group]["late"] for group in REQUESTS)
+            shed = sum(stats[group]["shed"] for group in REQUESTS)
+            failed = sum(stats[group]["failed"] for group in REQUESTS)
+            print(
+                f"{mode:<10}{clients:>8}{sum(good.values()):>11.0f}"
+                f"{good['read']:>8.0f}{good['write']:>8.0f}{good['auth']:>8.0f}"
+                f"{late:>8}{shed:>8}{failed:>8}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
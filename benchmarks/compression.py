@@ -0,0 +1,130 @@
+"""
+Байты на проводе и время сервера на запрос для разных кодировок.
+
+CompressionMiddleware вызывается напрямую как ASGI-приложение, без HTTP-клиента,
+поэтому в замер не попадает распаковка на стороне клиента. Внутреннее
+приложение отдает заранее сериализованный список контактов (как read_contacts
+с limit=N) одним сообщением или построчно, как StreamingResponse выгрузки.
+Время - perf_counter на запрос, столбец +us - разница с identity, то есть
+стоимость сжатия на сервере.
+
+    python -m benchmarks.compression
+"""
+import asyncio
+import json
+import time
+
+from app.core.compression import CompressionMiddleware, available_encodings
+
+ITERATIONS = 200
+SIZES = [1, 10, 100, 500]
+
+
+def make_contacts(count: int) -> list:
+    return [
+        {
+            "id": i,
+            "full_name": f"Иван Петров {i}",
+            "email": f"ivan.petrov{i}@example.com",
+            "phone": f"+7 900 {i:07d}",
+            "company": "ООО Ромашка",
+            "position": "Менеджер по продажам",
+            "user_id": 1,
+            "created_at": "2026-10-19T09:37:26",
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def json_app(body: bytes):
+    """Ответ одним сообщением, как JSONResponse"""
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def stream_app(rows: list):
+    """Построчная выгрузка, как StreamingResponse"""
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/x-ndjson; charset=utf-8")],
+        })
+        for row in rows:
+            await send({"type": "http.response.body", "body": row, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+async def measure(app, encoding: str):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", encoding.encode())],
+    }
+    wire = 0
+    sent_as = "identity"
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        nonlocal wire, sent_as
+        if message["type"] == "http.response.start":
+            for name, value in message["headers"]:
+                if name.lower() == b"content-encoding":
+                    sent_as = value.decode()
+        else:
+            wire += len(message.get("body", b""))
+
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        wire = 0
+        await app(scope, receive, send)
+    elapsed = (time.perf_counter() - started) / ITERATIONS
+    return wire, sent_as, elapsed
+
+
+async def main():
+    encodings = ["identity"] + available_encodings()
+    print(f"{ITERATIONS} requests per row, server time per request\n")
+    print(f"{'endpoint':<10}{'limit':>6}  {'accept':<10}{'sent as':<10}{'bytes':>9}{'ratio':>8}{'us':>9}{'+us':>9}")
+    print("-" * 71)
+    for endpoint in ("contacts", "export"):
+        for size in SIZES:
+            contacts = make_contacts(size)
+            if endpoint == "contacts":
+                inner = json_app(json.dumps(contacts, ensure_ascii=False).encode())
+            else:
+                inner = stream_app([
+                    (json.dumps(contact, ensure_ascii=False) + "\n").encode()
+                    for contact in contacts
+                ])
+            app = CompressionMiddleware(inner, minimum_size=1024)
+            # Прогрев
+            await measure(app, "gzip")
+
+            baseline_bytes = baseline_time = None
+            for encoding in encodings:
+                wire, sent_as, elapsed = await measure(app, encoding)
+                if baseline_bytes is None:
+                    baseline_bytes, baseline_time = wire, elapsed
+                print(
+                    f"{endpoint:<10}{size:>6}  {encoding:<10}{sent_as:<10}{wire:>9}"
+                    f"{wire / baseline_bytes:>8.2f}{elapsed * 1e6:>9.0f}{(elapsed - baseline_time) * 1e6:>9.0f}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Пропускная способность запросов с логированием и без него.
+
+Эндпоинт пишет одну строку лога приложения и несколько строк SQL-лога (как
+echo=True на типичном запросе), поверх работает AccessLogMiddleware. Логи
+пишутся в файл (быстрый приемник) и в файл с задержкой на каждую запись
+(медленный приемник: pipe в log-драйвер контейнера под backpressure). Режимы:
+
+    off   - логирование выключено
+    sync  - logging.basicConfig, как было раньше: формат и запись в event loop
+    queue - app.core.logger: QueueHandler/QueueListener, JSON, сэмплинг SQL
+
+    python -m benchmarks.logging_overhead
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.logger import AccessLogMiddleware, setup_logging, shutdown_logging
+
+REQUESTS = 3000
+CONCURRENCY = 50
+SQL_LINES_PER_REQUEST = 6
+# Задержка одной записи для медленного приемника
+SLOW_WRITE_DELAY = 0.0002
+
+
+class SlowStream:
+    """Файл, каждая запись в который блокирует поток на SLOW_WRITE_DELAY"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        time.sleep(SLOW_WRITE_DELAY)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app_logger = logging.getLogger("app.api")
+    sql_logger = logging.getLogger("sqlalchemy.engine.Engine")
+
+    @app.get("/api/v1/contacts/")
+    async def read_contacts():
+        app_logger.info("Listing contacts for user %s", 1)
+        for _ in range(SQL_LINES_PER_REQUEST):
+            sql_logger.info(
+                "SELECT contacts.id, contacts.full_name FROM contacts WHERE contacts.user_id = ? LIMIT ? OFFSET ? %s",
+                (1, 100, 0),
+            )
+        return [{"id": 1, "full_name": "Ivan"}]
+
+    app.add_middleware(AccessLogMiddleware)
+    return app
+
+
+def configure(mode: str, stream) -> None:
+    root = logging.getLogger()
+    root.handlers = []
+    if mode == "off":
+        root.setLevel(logging.CRITICAL)
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.CRITICAL)
+    elif mode == "sync":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+    elif mode == "queue":
+        setup_logging(level="INFO", sql=True, sql_sample_rate=0.01, access_sample_rate=1.0, stream=stream)
+
+
+async def run(mode: str, sink: str) -> float:
+    app = build_app()
+    with tempfile.NamedTemporaryFile("w", delete=False) as stream:
+        configure(mode, SlowStream(stream) if sink == "slow" else stream)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            remaining = REQUESTS
+
+            async def worker():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    await client.get("/api/v1/contacts/")
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+            elapsed = time.perf_counter() - started
+        shutdown_logging()
+        logging.getLogger().handlers = []
+    size = os.path.getsize(stream.name)
+    os.unlink(stream.name)
+    print(f"{sink:<8}{mode:<8}{REQUESTS / elapsed:>12.0f}{size / 1024:>12.0f}")
+    return REQUESTS / elapsed
+
+
+async def main():
+    print(f"{REQUESTS} requests, concurrency {CONCURRENCY}, {SQL_LINES_PER_REQUEST} SQL lines per request\n")
+    print(f"{'sink':<8}{'mode':<8}{'req/s':>12}{'log KiB':>12}")
+    print("-" * 40)
+    for sink in ("file", "slow"):
+        for mode in ("off", "sync", "queue"):
+            await run(mode, sink)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionController, Rejected
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_controller(max_concurrency=1, reserved=None, queue_size=10, queue_timeout=1.0):
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        reserved=reserved or {},
+        queue_sizes={"auth": queue_size, "write": queue_size, "read": queue_size},
+        queue_timeout=queue_timeout,
+    )
+
+
+def assert_idle(controller):
+    assert controller.active_total == 0
+    assert controller.waiting == {"auth": 0, "write": 0, "read": 0}
+    assert controller._waiters == []
+
+
+def test_reads_use_all_slots_except_reserved():
+    async def scenario():
+        controller = make_controller(max_concurrency=4, reserved={"auth": 1, "write": 1}, queue_size=0)
+        await controller.acquire("read")
+        await controller.acquire("read")
+        with pytest.raises(Rejected):
+            await controller.acquire("read")
+        # Резерв свободен для своих групп
+        await controller.acquire("write")
+        await controller.acquire("auth")
+        assert controller.active_total == 4
+
+    run(scenario())
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        controller = make_controller(queue_size=1)
+        await controller.acquire("read")
+        waiter = asyncio.ensure_future(controller.acquire("read"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected):
+            await controller.acquire("read")
+
+        controller.release("read")
+        await waiter
+        controller.release("read")
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_deadline_rejection_leaves_no_state():
+    async def scenario():
+        controller = make_controller(queue_timeout=0.01)
+        await controller.acquire("read")
+        with pytest.raises(Rejected):
+            await controller.acquire("write")
+        controller.release("read")
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_slot_granted_on_cancellation_is_released():
+    async def scenario():
+        controller = make_controller()
+        await controller.acquire("read")
+        waiter = asyncio.ensure_future(controller.acquire("write"))
+        await asyncio.sleep(0)
+
+        # Слот выдан ожидающему, но задачу отменили раньше, чем она проснулась
+        controller.release("read")
+        assert controller.active == {"auth": 0, "write": 1, "read": 0}
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert_idle(controller)
+
+    run(scenario())
+
+
+def test_auth_and_write_are_woken_before_read():
+    async def scenario():
+        controller = make_controller()
+        order = []
+
+        async def request(group):
+            await controller.acquire(group)
+            order.append(group)
+            await asyncio.sleep(0)
+            controller.release(group)
+
+        await controller.acquire("read")
+        tasks = []
+        for group in ("read", "write", "auth"):
+            tasks.append(asyncio.ensure_future(request(group)))
+            await asyncio.sleep(0)
+        controller.release("read")
+        await asyncio.gather(*tasks)
+
+        assert order == ["auth", "write", "read"]
+        assert_idle(controller)
+
+    run(scenario())
@@ -0,0 +1,120 @@
+import asyncio
+import zlib
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Client:
+    """Собирает ответ middleware: заголовки и тело по мере получения"""
+
+    def __init__(self):
+        self.headers = {}
+        self.chunks = []
+        self.received = asyncio.Event()
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.headers = {name.decode(): value.decode() for name, value in message["headers"]}
+        elif message.get("body"):
+            self.chunks.append(message["body"])
+            self.received.set()
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+async def call(app, client):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    await app(scope, receive, client.send)
+
+
+def stream_app(content_type, produce):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type)],
+        })
+
+        async def write(body, more_body=True):
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await produce(write)
+    return app
+
+
+def test_choose_encoding_prefers_client_q_then_server_order():
+    assert choose_encoding("gzip;q=0.5, br", ["zstd", "br", "gzip"]) == "br"
+    assert choose_encoding("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert choose_encoding("*;q=0, identity", ["gzip"]) is None
+
+
+def test_slow_start_stream_is_still_compressed():
+    rows = [f"{i},Иван Петров {i},ivan{i}@example.com\n".encode() for i in range(300)]
+
+    async def produce(write):
+        # Заголовок CSV, пауза на запрос к БД, затем строки выгрузки
+        await write(b"id,full_name,email\n")
+        await asyncio.sleep(0.15)
+        for row in rows:
+            await write(row)
+        await write(b"", more_body=False)
+
+    async def scenario():
+        client = Client()
+        app = CompressionMiddleware(stream_app(b"text/csv", produce), flush_interval=0.1)
+        await call(app, client)
+        return client
+
+    client = run(scenario())
+    assert client.headers["content-encoding"] == "gzip"
+    assert zlib.decompress(client.body, 31) == b"id,full_name,email\n" + b"".join(rows)
+
+
+def test_idle_stream_is_flushed_without_next_chunk():
+    async def scenario():
+        resume = asyncio.Event()
+
+        async def produce(write):
+            await write(b"data: first\n\n")
+            # Следующее событие придет не скоро
+            await resume.wait()
+            await write(b"data: second\n\n", more_body=False)
+
+        client = Client()
+        app = CompressionMiddleware(stream_app(b"text/event-stream", produce), flush_interval=0.05)
+        task = asyncio.ensure_future(call(app, client))
+        await asyncio.wait_for(client.received.wait(), 1.0)
+        first = zlib.decompressobj(31).decompress(client.body)
+        resume.set()
+        await task
+        return client, first
+
+    client, first = run(scenario())
+    assert client.headers["content-encoding"] == "gzip"
+    assert first == b"data: first\n\n"
+    assert zlib.decompress(client.body, 31) == b"data: first\n\ndata: second\n\n"
+
+
+def test_short_stream_is_sent_raw():
+    async def produce(write):
+        await write(b"id,full_name\n")
+        await write(b"1,Ivan\n", more_body=False)
+
+    async def scenario():
+        client = Client()
+        await call(CompressionMiddleware(stream_app(b"text/csv", produce)), client)
+        return client
+
+    client = run(scenario())
+    assert "content-encoding" not in client.headers
+    assert client.body == b"id,full_name\n1,Ivan\n"
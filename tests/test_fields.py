@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.v1 import contacts, deals
+from app.api.v1.fields import all_fields
+from app.core.database import Base
+from app.core.security import get_current_user
+from app.core.sharding import get_tenant_db
+from app.models.user import User
+from app.models.contact import Contact
+from app.models.deal import Deal
+from app.schemas.contact import ContactPartial
+from app.schemas.deal import DealPartial
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def request(tmp_path, *paths: str) -> list:
+    """GET-запросы к роутерам контактов и сделок поверх временной БД с одним пользователем"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fields.db'}")
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    user = User(id=1, email="user@example.com", hashed_password="x")
+    async with session_maker() as session:
+        session.add(user)
+        session.add(Contact(id=1, full_name="Ivan", email="ivan@example.com", notes="long notes", user_id=1))
+        session.add(Deal(id=1, title="Deal", description="long description", amount=10.0, user_id=1))
+        await session.commit()
+
+    async def override_db():
+        async with session_maker() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(contacts.router, prefix="/api/v1/contacts")
+    app.include_router(deals.router, prefix="/api/v1/deals")
+    app.dependency_overrides[get_tenant_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+    finally:
+        await engine.dispose()
+
+
+def test_partial_models_cover_all_columns():
+    assert set(ContactPartial.model_fields) == set(all_fields(Contact))
+    assert set(DealPartial.model_fields) == set(all_fields(Deal))
+    assert ContactPartial.model_fields["id"].is_required()
+    assert not ContactPartial.model_fields["full_name"].is_required()
+
+
+def test_default_list_omits_text_columns(tmp_path):
+    contacts_response, deals_response = run(request(tmp_path, "/api/v1/contacts/", "/api/v1/deals/"))
+    assert contacts_response.status_code == 200
+    [contact] = contacts_response.json()
+    assert contact["full_name"] == "Ivan"
+    assert "notes" not in contact
+
+    [deal] = deals_response.json()
+    assert deal["title"] == "Deal"
+    assert "description" not in deal
+
+
+def test_explicit_fields_are_returned(tmp_path):
+    list_response, detail_response = run(request(
+        tmp_path, "/api/v1/contacts/?fields=notes", "/api/v1/deals/1?fields=title,description",
+    ))
+    assert list_response.status_code == 200
+    assert list_response.json() == [{"id": 1, "notes": "long notes"}]
+    assert detail_response.status_code == 200
+    assert detail_response.json() == {"id": 1, "title": "Deal", "description": "long description"}
+
+
+def test_detail_without_fields_returns_full_schema(tmp_path):
+    [response] = run(request(tmp_path, "/api/v1/contacts/1"))
+    assert response.status_code == 200
+    assert set(response.json()) == set(all_fields(Contact))
+
+
+def test_unknown_field_is_rejected(tmp_path):
+    [response] = run(request(tmp_path, "/api/v1/contacts/?fields=full_name,password"))
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Unknown fields: password"}
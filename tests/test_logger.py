@@ -0,0 +1,147 @@
+import asyncio
+import io
+import json
+import logging
+
+import pytest
+
+from app.core import logger as app_logger
+from app.core.logger import (
+    ACCESS_LOGGER,
+    AccessLogMiddleware,
+    RequestIdFilter,
+    SamplingFilter,
+    request_id_var,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def make_record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def restore_logging():
+    """Вернуть корневой логгер и логгеры uvicorn в исходное состояние"""
+    names = ["", "uvicorn", "uvicorn.error", "uvicorn.access", ACCESS_LOGGER]
+    saved = {
+        name: (logging.getLogger(name).handlers[:], logging.getLogger(name).level,
+               logging.getLogger(name).propagate, logging.getLogger(name).disabled)
+        for name in names
+    }
+    yield
+    shutdown_logging()
+    for name, (handlers, level, propagate, disabled) in saved.items():
+        target = logging.getLogger(name)
+        target.handlers = handlers
+        target.setLevel(level)
+        target.propagate = propagate
+        target.disabled = disabled
+
+
+def test_sampling_rates(monkeypatch):
+    sampling = SamplingFilter({"sqlalchemy.engine": 0.0, "app.access": 0.5})
+    assert not sampling.filter(make_record("sqlalchemy.engine.Engine"))
+    assert sampling.filter(make_record("app.api"))
+
+    monkeypatch.setattr(app_logger.random, "random", lambda: 0.4)
+    assert sampling.filter(make_record("app.access"))
+    monkeypatch.setattr(app_logger.random, "random", lambda: 0.6)
+    assert not sampling.filter(make_record("app.access"))
+
+
+def test_warnings_are_never_sampled():
+    sampling = SamplingFilter({"sqlalchemy.engine": 0.0})
+    assert sampling.filter(make_record("sqlalchemy.engine.Engine", logging.WARNING))
+    assert sampling.filter(make_record("sqlalchemy.engine.Engine", logging.ERROR))
+
+
+def test_request_id_filter_uses_current_request():
+    token = request_id_var.set("abc")
+    try:
+        record = make_record("app")
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+    assert record.request_id == "abc"
+
+
+def test_access_log_propagates_and_echoes_request_id(restore_logging):
+    handler = ListHandler()
+    handler.addFilter(RequestIdFilter())
+    access_logger = logging.getLogger(ACCESS_LOGGER)
+    access_logger.addHandler(handler)
+    access_logger.setLevel(logging.INFO)
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append(request_id_var.get())
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def call(headers):
+        sent = []
+        scope = {"type": "http", "method": "GET", "path": "/health", "headers": headers}
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await AccessLogMiddleware(app)(scope, receive, send)
+        return dict(sent[0]["headers"])
+
+    headers = asyncio.run(call([(b"x-request-id", b"req-1")]))
+    assert headers[b"x-request-id"] == b"req-1"
+    assert seen == ["req-1"]
+    assert handler.records[0].request_id == "req-1"
+    assert handler.records[0].status == 204
+
+    # Без заголовка request_id генерируется
+    headers = asyncio.run(call([]))
+    assert len(headers[b"x-request-id"]) == 32
+    assert seen[1] == headers[b"x-request-id"].decode()
+    assert request_id_var.get() is None
+
+
+def test_uvicorn_handlers_are_removed(restore_logging):
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).addHandler(logging.StreamHandler(io.StringIO()))
+        logging.getLogger(name).propagate = False
+
+    app_logger._route_uvicorn_loggers()
+
+    for name in ("uvicorn", "uvicorn.error"):
+        assert logging.getLogger(name).handlers == []
+        assert logging.getLogger(name).propagate
+    access_logger = logging.getLogger("uvicorn.access")
+    assert access_logger.handlers == []
+    assert access_logger.disabled
+
+
+def test_setup_logging_writes_json_through_queue(restore_logging):
+    stream = io.StringIO()
+    setup_logging(stream=stream)
+    token = request_id_var.set("req-2")
+    try:
+        logging.getLogger("app.test").info("user %s logged in", 7, extra={"user_id": 7})
+    finally:
+        request_id_var.reset(token)
+    shutdown_logging()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "user 7 logged in"
+    assert entry["request_id"] == "req-2"
+    assert entry["user_id"] == 7
+    assert entry["logger"] == "app.test"
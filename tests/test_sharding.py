@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import Base
+from app.core.sharding import ShardRouter, TenantMovingError, ID_BLOCK_SIZE
+from app.models.user import User
+from app.models.contact import Contact
+from app.models.deal import Deal
+from app.models.tenant_shard import TenantShard
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def make_router(tmp_path) -> ShardRouter:
+    main_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'main.db'}")
+    router = ShardRouter(
+        [f"sqlite+aiosqlite:///{tmp_path / 'shard1.db'}"],
+        map_ttl=0,
+        main_engine=main_engine,
+    )
+    async with main_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await router.create_tables()
+    return router
+
+
+async def close(router: ShardRouter) -> None:
+    for shard_engine in router.engines:
+        await shard_engine.dispose()
+
+
+async def add_user(router: ShardRouter, user_id: int) -> None:
+    async with router.session(0) as session:
+        session.add(User(id=user_id, email=f"user{user_id}@example.com", hashed_password="x"))
+        await session.commit()
+
+
+def test_unmapped_user_stays_on_main_shard(tmp_path):
+    async def scenario():
+        router = await make_router(tmp_path)
+        try:
+            # Пользователь создан до включения шардов: данные в основной БД
+            await add_user(router, 1)
+            assert await router.shard_for(1) == 0
+            async with router.session(0) as session:
+                assert await session.get(TenantShard, 1) is None
+        finally:
+            await close(router)
+
+    run(scenario())
+
+
+def test_registered_tenant_is_placed_by_user_id(tmp_path):
+    async def scenario():
+        router = await make_router(tmp_path)
+        try:
+            await add_user(router, 3)
+            async with router.session(0) as session:
+                assert await router.register_tenant(session, 3) == 1
+            assert await router.shard_for(3) == 1
+        finally:
+            await close(router)
+
+    run(scenario())
+
+
+def test_moving_tenant_is_rejected(tmp_path):
+    async def scenario():
+        router = await make_router(tmp_path)
+        try:
+            await add_user(router, 1)
+            async with router.session(0) as session:
+                session.add(TenantShard(user_id=1, shard=0, is_moving=True))
+                await session.commit()
+            with pytest.raises(TenantMovingError):
+                await router.shard_for(1)
+        finally:
+            await close(router)
+
+    run(scenario())
+
+
+def test_next_id_starts_after_existing_rows(tmp_path):
+    async def scenario():
+        router = await make_router(tmp_path)
+        try:
+            await add_user(router, 1)
+            async with router.session(0) as session:
+                session.add(Contact(id=5, full_name="Old", user_id=1))
+                await session.commit()
+
+            assert await router.next_id(Contact) == 6
+            assert await router.next_id(Contact) == 7
+
+            # Другой процесс получает свой блок, без пересечений
+            other = ShardRouter([], map_ttl=0, main_engine=router.engines[0])
+            assert await other.next_id(Contact) == 6 + ID_BLOCK_SIZE
+        finally:
+            await close(router)
+
+    run(scenario())
+
+
+def test_move_tenant_keeps_ids(tmp_path):
+    async def scenario():
+        router = await make_router(tmp_path)
+        try:
+            await add_user(router, 1)
+            await add_user(router, 2)
+            async with router.session(0) as session:
+                first = Contact(id=await router.next_id(Contact), full_name="A", user_id=1)
+                second = Contact(id=await router.next_id(Contact), full_name="B", user_id=1)
+                session.add_all([first, second])
+                session.add(Deal(
+                    id=await router.next_id(Deal), title="D", user_id=1, contact_id=second.id,
+                ))
+                await session.commit()
+            # Чужой контакт уже лежит в целевом шарде
+            async with router.session(1) as session:
+                session.add(Contact(id=await router.next_id(Contact), full_name="C", user_id=2))
+                await session.commit()
+
+            assert await router.move_tenant(1, 1) == 3
+
+            async with router.session(1) as session:
+                contact_ids = (await session.execute(
+                    select(Contact.id).where(Contact.user_id == 1).order_by(Contact.id)
+                )).scalars().all()
+                deal = (await session.execute(select(Deal).where(Deal.user_id == 1))).scalar_one()
+            assert contact_ids == [first.id, second.id]
+            assert deal.contact_id == second.id
+
+            async with router.session(0) as session:
+                assert (await session.execute(
+                    select(Contact).where(Contact.user_id == 1)
+                )).first() is None
+                placement = await session.get(TenantShard, 1)
+                assert placement.shard == 1
+                assert not placement.is_moving
+
+            assert await router.shard_for(1) == 1
+        finally:
+            await close(router)
+
+    run(scenario())
+
+
+def test_placement_cache_is_bounded_and_drops_expired(tmp_path):
+    async def scenario():
+        router = await make_router(tmp_path)
+        router.map_ttl = 60
+        router.cache_size = 2
+        try:
+            for user_id in (1, 2, 3):
+                await add_user(router, user_id)
+                await router.shard_for(user_id)
+            assert list(router._cache) == [2, 3]
+
+            router._cache[2] = (0, 0.0)
+            assert router._cached_shard(2, now=1.0) is None
+            assert 2 not in router._cache
+        finally:
+            await close(router)
+
+    run(scenario())